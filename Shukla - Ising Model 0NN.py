@@ -54,7 +54,7 @@ data_pts = 40                # data_pts is the number of sweep data points for t
 
 
 # This section creates the initial system, a static 2D array of spins (up or down).
-initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
+initial_grid = 2 * numpy.random.randint(0, 2, size = [y_len, x_len], dtype = numpy.int8) - 1
 
 ''' Note that this is faster than my original choice of how to initialise the system: 
     initial_grid = [[-1.0 if random.random() <= 0.5 else 1.0 for cube in xrange(x_len)] for row in xrange(y_len)] '''
@@ -62,44 +62,32 @@ initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
 
 # This function provides a printed version of the 2D Ising grid.
 def print_grid(grating):
-    Ising_grid_printed = []
-    
-    for chain in grating:
-        IG_single_row = []
-        
-        for entry in chain:
-            if entry == -1.0:
-                IG_single_row += ["-"]
-            elif entry == +1.0:
-                IG_single_row += ["+"]
-            else:
-                raise ArithmeticError("Ising spin must be +1.0 or -1.0")
-        
-        IG_single_row_printed = " ".join(IG_single_row)
-        Ising_grid_printed += [IG_single_row_printed]
-    
-    for IG_row in Ising_grid_printed:
-        print IG_row
+    grating = numpy.asarray(grating)
+    assert numpy.all(numpy.abs(grating) == 1), "Ising spin must be +1.0 or -1.0"
+
+    IG_chars = numpy.where(grating > 0, "+", "-")
+    Ising_grid_printed = [" ".join(IG_single_row) for IG_single_row in IG_chars]
+
+    print "\n".join(Ising_grid_printed)
     
     return Ising_grid_printed
 
 
 # This function performs a single Monte Carlo update.
 def MC_update(lat, h, Jx, Jy, T):
-    x_len = len(lat[0])
-    y_len = len(lat)
+    y_len, x_len = lat.shape
     beta = 1.0/T
     
     for y_pos in xrange(y_len):
         for x_pos in xrange(x_len):
             dE = 0.0
-            dE += h * lat[y_pos][x_pos]
-            dE += Jx * lat[y_pos][(x_pos-1) % x_len] * lat[y_pos][x_pos]
-            dE += Jx * lat[y_pos][(x_pos+1) % x_len] * lat[y_pos][x_pos]
-            dE += Jy * lat[(y_pos-1) % y_len][x_pos] * lat[y_pos][x_pos]
-            dE += Jy * lat[(y_pos+1) % y_len][x_pos] * lat[y_pos][x_pos]
+            dE += h * lat[y_pos, x_pos]
+            dE += Jx * lat[y_pos, (x_pos-1) % x_len] * lat[y_pos, x_pos]
+            dE += Jx * lat[y_pos, (x_pos+1) % x_len] * lat[y_pos, x_pos]
+            dE += Jy * lat[(y_pos-1) % y_len, x_pos] * lat[y_pos, x_pos]
+            dE += Jy * lat[(y_pos+1) % y_len, x_pos] * lat[y_pos, x_pos]
             if random.random() <= math.exp(-2*beta*dE):
-                lat[y_pos][x_pos] = -lat[y_pos][x_pos]
+                lat[y_pos, x_pos] = -lat[y_pos, x_pos]
     
     return lat
 
@@ -129,30 +117,17 @@ def update_grid(lat):
 
 # This function retrieves the magnetisation, energy, and kth nearest-neighbour two-point Green function of a given lattice.
 def lat_props(trel, mu, ccx, ccy, temp, dist, conn):
-    net_M = 0.0
-    net_E = 0.0
-    net_corr = 0.0
-    
-    x_size = len(trel[0])
-    y_size = len(trel)
+    trel = numpy.asarray(trel, dtype = numpy.int64)
+    y_size, x_size = trel.shape
     
     sites = float(x_size * y_size)
 
-    for y_pt in xrange(y_size):
-        for x_pt in xrange(x_size):
-            curr_site = trel[y_pt][x_pt]
-            next_site_down = trel[(y_pt + dist) % y_size][x_pt]
-            next_site_right = trel[y_pt][(x_pt + dist) % x_size]
-            
-            net_M += curr_site
-            
-            net_E += -mu * curr_site
-            net_E += -ccx * trel[y_pt][(x_pt + 1) % x_size] * curr_site
-            net_E += -ccy * trel[(y_pt + 1) % y_size][x_pt] * curr_site
-            
-            net_corr += curr_site * next_site_down
-            net_corr += curr_site * next_site_right
-            
+    net_M = int(trel.sum())
+    bonds_x = int((trel * numpy.roll(trel, -1, axis = 1)).sum())
+    bonds_y = int((trel * numpy.roll(trel, -1, axis = 0)).sum())
+    net_corr = int((trel * numpy.roll(trel, -dist, axis = 0)).sum() + (trel * numpy.roll(trel, -dist, axis = 1)).sum())
+    
+    net_E = -mu * net_M - ccx * bonds_x - ccy * bonds_y
     
     lat_m = net_M / sites
     lat_e = net_E / sites
@@ -173,7 +148,14 @@ def lat_props(trel, mu, ccx, ccy, temp, dist, conn):
     disconnected correlation function (i.e. G^(2)(i, i+k) = <x_i x_(i+k)>), depending on whether or
     not we have conn = True or conn = False. Since <x_i> = <x_(i+k)> = m (the average per-site
     magnetisation), the two-point connected correlation function just substitutes m^2 for
-    <x_i><x_(i+k)>. '''
+    <x_i><x_(i+k)>.
+
+    The sums are taken over whole shifted copies of the lattice via numpy.roll, rather than site by
+    site in Python: numpy.roll(trel, -1, axis = 1)[y, x] is the right-hand neighbour trel[y, x + 1]
+    (with periodic boundary conditions), and likewise for the neighbour below and the kth neighbours.
+    The magnetisation, the bond sums, and the spin products are all integers for ±1 spins, so we sum
+    them as integers (in int64, so that the int8 lattice can't overflow) and only bring in the
+    (floating-point) field and couplings once, at the end. '''
 
 
 # This function performs the MC thermalisation.
@@ -192,19 +174,16 @@ def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample,
     MC_E = [0] * MC_iter
     MC_G = [0] * MC_iter
     
-    x_dist = len(array[0])
-    y_dist = len(array)
+    y_dist, x_dist = numpy.shape(array)
     points = float(x_dist * y_dist)
 
     b = 1.0/tepl
 
-    now_lat = array
+    now_lat = numpy.ascontiguousarray(array, dtype = numpy.int8)
     
     for update in xrange(MC_iter):
-        now_lat = MC_thermal(now_lat, therm_steps_per_sample, ext_field, cc_x, cc_y, tepl)
-        now_update = MC_update(now_lat, ext_field, cc_x, cc_y, tepl)
-        now_props = lat_props(now_update, ext_field, cc_x, cc_y, tepl, many_MC_G_dist, many_MC_G_corr)
-        now_lat = now_update
+        now_lat = MC_thermal(now_lat, therm_steps_per_sample + 1, ext_field, cc_x, cc_y, tepl)
+        now_props = lat_props(now_lat, ext_field, cc_x, cc_y, tepl, many_MC_G_dist, many_MC_G_corr)
         
         MC_M[update] = now_props[0]
         MC_E[update] = now_props[2]
@@ -256,19 +235,19 @@ def h_sweep(grid_in, h_min, h_max, sweep_Jx, sweep_Jy, sweep_T, MC_steps, points
                 
                 ideal_m_now = math.tanh(sweep_b*h_now)
                 m_diff_now = MC_results_now[2] - ideal_m_now
-                h_sweep_m_vals += [[h_now, MC_results_now[2], ideal_m_now, m_diff_now]]
+                h_sweep_m_vals.append([h_now, MC_results_now[2], ideal_m_now, m_diff_now])
                 
                 ideal_e_now = -h_now * math.tanh(sweep_b*h_now)
                 e_diff_now = MC_results_now[4] - ideal_e_now
-                h_sweep_e_vals += [[h_now, MC_results_now[4], ideal_e_now, e_diff_now]]
+                h_sweep_e_vals.append([h_now, MC_results_now[4], ideal_e_now, e_diff_now])
                 
                 ideal_susc_now = sweep_b * math.pow(1/math.cosh(sweep_b*h_now), 2)
                 susc_diff_now = MC_results_now[6] - ideal_susc_now
-                h_sweep_susc_vals += [[h_now, MC_results_now[6], ideal_susc_now, susc_diff_now]]
+                h_sweep_susc_vals.append([h_now, MC_results_now[6], ideal_susc_now, susc_diff_now])
                 
                 ideal_cv_now = math.pow(sweep_b, 2) * math.pow(h_now, 2) * math.pow(1/math.cosh(sweep_b*h_now), 2)
                 cv_diff_now = MC_results_now[7] - ideal_cv_now
-                h_sweep_cv_vals += [[h_now, MC_results_now[7], ideal_cv_now, cv_diff_now]]
+                h_sweep_cv_vals.append([h_now, MC_results_now[7], ideal_cv_now, cv_diff_now])
                 
                 h_now += h_step
         
@@ -279,19 +258,19 @@ def h_sweep(grid_in, h_min, h_max, sweep_Jx, sweep_Jy, sweep_T, MC_steps, points
                 
                 ideal_m_now = math.tanh(sweep_b*h_now)
                 m_diff_now = MC_results_now[2] - ideal_m_now
-                h_sweep_m_vals += [[h_now, MC_results_now[2], ideal_m_now, m_diff_now]]
+                h_sweep_m_vals.append([h_now, MC_results_now[2], ideal_m_now, m_diff_now])
                 
                 ideal_e_now = -h_now * math.tanh(sweep_b*h_now)
                 e_diff_now = MC_results_now[4] - ideal_e_now
-                h_sweep_e_vals += [[h_now, MC_results_now[4], ideal_e_now, e_diff_now]]
+                h_sweep_e_vals.append([h_now, MC_results_now[4], ideal_e_now, e_diff_now])
                 
                 ideal_susc_now = sweep_b * math.pow(1/math.cosh(sweep_b*h_now), 2)
                 susc_diff_now = MC_results_now[6] - ideal_susc_now
-                h_sweep_susc_vals += [[h_now, MC_results_now[6], ideal_susc_now, susc_diff_now]]
+                h_sweep_susc_vals.append([h_now, MC_results_now[6], ideal_susc_now, susc_diff_now])
                 
                 ideal_cv_now = math.pow(sweep_b, 2) * math.pow(h_now, 2) * math.pow(1/math.cosh(sweep_b*h_now), 2)
                 cv_diff_now = MC_results_now[7] - ideal_cv_now
-                h_sweep_cv_vals += [[h_now, MC_results_now[7], ideal_cv_now, cv_diff_now]]
+                h_sweep_cv_vals.append([h_now, MC_results_now[7], ideal_cv_now, cv_diff_now])
                 
                 h_now += h_step
     
@@ -321,19 +300,19 @@ def T_sweep(lat_in, T_min, T_max, spect_h, spect_Jx, spect_Jy, MC_num, points, T
                 
                 ideal_mag_now = math.tanh(b_curr*spect_h)
                 mag_diff_now = MC_results_now[2] - ideal_mag_now
-                T_sweep_mag_vals += [[T_curr, MC_results_now[2], ideal_mag_now, mag_diff_now]]
+                T_sweep_mag_vals.append([T_curr, MC_results_now[2], ideal_mag_now, mag_diff_now])
                 
                 ideal_ener_now = -spect_h * math.tanh(b_curr*spect_h)
                 ener_diff_now = MC_results_now[4] - ideal_ener_now
-                T_sweep_ener_vals += [[T_curr, MC_results_now[4], ideal_ener_now, ener_diff_now]]
+                T_sweep_ener_vals.append([T_curr, MC_results_now[4], ideal_ener_now, ener_diff_now])
                 
                 ideal_chi_now = b_curr * math.pow(1/math.cosh(b_curr*spect_h), 2)
                 chi_diff_now = MC_results_now[6] - ideal_chi_now
-                T_sweep_chi_vals += [[T_curr, MC_results_now[6], ideal_chi_now, chi_diff_now]]
+                T_sweep_chi_vals.append([T_curr, MC_results_now[6], ideal_chi_now, chi_diff_now])
                 
                 ideal_spec_heat_now = math.pow(b_curr, 2) * math.pow(spect_h, 2) * math.pow(1/math.cosh(b_curr*spect_h), 2)
                 spec_heat_diff_now = MC_results_now[7] - ideal_spec_heat_now
-                T_sweep_spec_heat_vals += [[T_curr, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now]]
+                T_sweep_spec_heat_vals.append([T_curr, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now])
                 T_curr += T_step
 
         else:
@@ -343,19 +322,19 @@ def T_sweep(lat_in, T_min, T_max, spect_h, spect_Jx, spect_Jy, MC_num, points, T
                 
                 ideal_mag_now = math.tanh(b_curr*spect_h)
                 mag_diff_now = MC_results_now[2] - ideal_mag_now
-                T_sweep_mag_vals += [[T_curr, MC_results_now[2], ideal_mag_now, mag_diff_now]]
+                T_sweep_mag_vals.append([T_curr, MC_results_now[2], ideal_mag_now, mag_diff_now])
                 
                 ideal_ener_now = -spect_h * math.tanh(b_curr*spect_h)
                 ener_diff_now = MC_results_now[4] - ideal_ener_now
-                T_sweep_ener_vals += [[T_curr, MC_results_now[4], ideal_ener_now, ener_diff_now]]
+                T_sweep_ener_vals.append([T_curr, MC_results_now[4], ideal_ener_now, ener_diff_now])
                 
                 ideal_chi_now = b_curr * math.pow(1/math.cosh(b_curr*spect_h), 2)
                 chi_diff_now = MC_results_now[6] - ideal_chi_now
-                T_sweep_chi_vals += [[T_curr, MC_results_now[6], ideal_chi_now, chi_diff_now]]
+                T_sweep_chi_vals.append([T_curr, MC_results_now[6], ideal_chi_now, chi_diff_now])
                 
                 ideal_spec_heat_now = math.pow(b_curr, 2) * math.pow(spect_h, 2) * math.pow(1/math.cosh(b_curr*spect_h), 2)
                 spec_heat_diff_now = MC_results_now[7] - ideal_spec_heat_now
-                T_sweep_spec_heat_vals += [[T_curr, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now]]
+                T_sweep_spec_heat_vals.append([T_curr, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now])
                 T_curr += T_step
     
     return (T_sweep_mag_vals, T_sweep_ener_vals, T_sweep_chi_vals, T_sweep_spec_heat_vals)
@@ -386,19 +365,19 @@ def coup_sweep(kattam_in, Jx_min, Jx_max, Jy_min, Jy_max, h_over_range, T_over_r
                 
                 ideal_mag_now = math.tanh(b_over_range*h_over_range)
                 mag_diff_now = MC_results_now[2] - ideal_mag_now
-                coup_sweep_mg_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now]]
+                coup_sweep_mg_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now])
                 
                 ideal_ener_now = -h_over_range * math.tanh(b_over_range*h_over_range)
                 ener_diff_now = MC_results_now[4] - ideal_ener_now
-                coup_sweep_u_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now]]
+                coup_sweep_u_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now])
                 
                 ideal_chi_now = b_over_range * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 chi_diff_now = MC_results_now[6] - ideal_chi_now
-                coup_sweep_sscpt_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now]]
+                coup_sweep_sscpt_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now])
                 
                 ideal_spec_heat_now = math.pow(b_over_range, 2) * math.pow(h_over_range, 2) * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 spec_heat_diff_now = MC_results_now[7] - ideal_spec_heat_now
-                coup_sweep_spc_heat_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now]]
+                coup_sweep_spc_heat_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now])
                 
                 Jx_jetzt += Jx_step
                 Jy_jetzt += Jy_step
@@ -410,19 +389,19 @@ def coup_sweep(kattam_in, Jx_min, Jx_max, Jy_min, Jy_max, h_over_range, T_over_r
                 
                 ideal_mag_now = math.tanh(b_over_range*h_over_range)
                 mag_diff_now = MC_results_now[2] - ideal_mag_now
-                coup_sweep_mg_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now]]
+                coup_sweep_mg_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now])
                 
                 ideal_ener_now = -h_over_range * math.tanh(b_over_range*h_over_range)
                 ener_diff_now = MC_results_now[4] - ideal_ener_now
-                coup_sweep_u_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now]]
+                coup_sweep_u_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now])
                 
                 ideal_chi_now = b_over_range * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 chi_diff_now = MC_results_now[6] - ideal_chi_now
-                coup_sweep_sscpt_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now]]
+                coup_sweep_sscpt_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now])
                 
                 ideal_spec_heat_now = math.pow(b_over_range, 2) * math.pow(h_over_range, 2) * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 spec_heat_diff_now = MC_results_now[7] - ideal_spec_heat_now
-                coup_sweep_spc_heat_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now]]
+                coup_sweep_spc_heat_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now])
                 
                 Jx_jetzt += Jx_step
                 Jy_jetzt += Jy_step
@@ -434,19 +413,19 @@ def coup_sweep(kattam_in, Jx_min, Jx_max, Jy_min, Jy_max, h_over_range, T_over_r
                 
                 ideal_mag_now = math.tanh(b_over_range*h_over_range)
                 mag_diff_now = MC_results_now[2] - ideal_mag_now
-                coup_sweep_mg_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now]]
+                coup_sweep_mg_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now])
                 
                 ideal_ener_now = -h_over_range * math.tanh(b_over_range*h_over_range)
                 ener_diff_now = MC_results_now[4] - ideal_ener_now
-                coup_sweep_u_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now]]
+                coup_sweep_u_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now])
                 
                 ideal_chi_now = b_over_range * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 chi_diff_now = MC_results_now[6] - ideal_chi_now
-                coup_sweep_sscpt_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now]]
+                coup_sweep_sscpt_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now])
                 
                 ideal_spec_heat_now = math.pow(b_over_range, 2) * math.pow(h_over_range, 2) * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 spec_heat_diff_now = MC_results_now[7] - ideal_spec_heat_now
-                coup_sweep_spc_heat_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now]]
+                coup_sweep_spc_heat_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now])
                 
                 Jx_jetzt += Jx_step
                 Jy_jetzt += Jy_step
@@ -458,19 +437,19 @@ def coup_sweep(kattam_in, Jx_min, Jx_max, Jy_min, Jy_max, h_over_range, T_over_r
                 
                 ideal_mag_now = math.tanh(b_over_range*h_over_range)
                 mag_diff_now = MC_results_now[2] - ideal_mag_now
-                coup_sweep_mg_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now]]
+                coup_sweep_mg_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[2], ideal_mag_now, mag_diff_now])
                 
                 ideal_ener_now = -h_over_range * math.tanh(b_over_range*h_over_range)
                 ener_diff_now = MC_results_now[4] - ideal_ener_now
-                coup_sweep_u_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now]]
+                coup_sweep_u_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[4], ideal_ener_now, ener_diff_now])
                 
                 ideal_chi_now = b_over_range * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 chi_diff_now = MC_results_now[6] - ideal_chi_now
-                coup_sweep_sscpt_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now]]
+                coup_sweep_sscpt_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[6], ideal_chi_now, chi_diff_now])
                 
                 ideal_spec_heat_now = math.pow(b_over_range, 2) * math.pow(h_over_range, 2) * math.pow(1/math.cosh(b_over_range*h_over_range), 2)
                 spec_heat_diff_now = MC_results_now[7] - ideal_spec_heat_now
-                coup_sweep_spc_heat_vals += [[Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now]]
+                coup_sweep_spc_heat_vals.append([Jx_jetzt, Jy_jetzt, MC_results_now[7], ideal_spec_heat_now, spec_heat_diff_now])
                 
                 Jx_jetzt += Jx_step
                 Jy_jetzt += Jy_step
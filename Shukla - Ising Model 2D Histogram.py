@@ -10,10 +10,9 @@
 
 
 # This section imports the libraries necessary to run the program.
-import math
 import matplotlib
+import numba
 import numpy
-import random
 import time
 
 
@@ -48,7 +47,7 @@ kNN_2pt_G_conn = False       # kNN_2pt_G_conn tells us whether we're looking at
 
 
 # This section creates the initial system, a static 2D array of spins (up or down).
-initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
+initial_grid = 2 * numpy.random.randint(0, 2, size = [y_len, x_len], dtype = numpy.int8) - 1
 
 ''' Note that this is faster than my original choice of how to initialise the system: 
     initial_grid = [[-1.0 if random.random() <= 0.5 else 1.0 for cube in xrange(x_len)] for row in xrange(y_len)] '''
@@ -56,44 +55,79 @@ initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
 
 # This function provides a printed version of the 2D Ising grid.
 def print_grid(grating):
-    Ising_grid_printed = []
+    grating = numpy.asarray(grating)
+    assert numpy.all(numpy.abs(grating) == 1), "Ising spin must be +1.0 or -1.0"
 
-    for chain in grating:
-        IG_single_row = []
+    IG_chars = numpy.where(grating > 0, "+", "-")
+    Ising_grid_printed = [" ".join(IG_single_row) for IG_single_row in IG_chars]
 
-        for entry in chain:
-            if entry == -1.0:
-                IG_single_row += ["-"]
-            elif entry == +1.0:
-                IG_single_row += ["+"]
-            else:
-                raise ArithmeticError("Ising spin must be +1.0 or -1.0")
-
-        IG_single_row_printed = " ".join(IG_single_row)
-        Ising_grid_printed += [IG_single_row_printed]
-
-    for IG_row in Ising_grid_printed:
-        print IG_row
+    print "\n".join(Ising_grid_printed)
     
     return Ising_grid_printed
 
 
-# This function performs a single Monte Carlo update.
-def MC_update(lat, h, Jx, Jy, T):
-    x_size = len(lat[0])
-    y_size = len(lat)
+# This function tabulates the Metropolis acceptance probabilities for every local environment of a site.
+def accept_probs(h, Jx, Jy, T):
     beta = 1.0 / T
 
+    spins = numpy.array([-1.0, 1.0]).reshape(2, 1, 1)
+    nbr_sums = numpy.array([-2.0, 0.0, 2.0])
+    local_fields = h + Jx * nbr_sums.reshape(3, 1) + Jy * nbr_sums.reshape(1, 3)
+
+    probs = numpy.exp(numpy.minimum((-2.0 * beta) * spins * local_fields, 0.0))
+
+    return probs
+
+''' Since the spins are ±1, the x-direction and y-direction neighbour sums can only be -2, 0, or 2,
+    so for a given (h, Jx, Jy, T) there are only 18 distinct values of exp(-2*beta*dE); 9 for each
+    spin. The table is indexed as probs[(spin + 1) >> 1, (x_sum + 2) >> 1, (y_sum + 2) >> 1]. We
+    keep the x-direction and y-direction sums separate (rather than tabulating the total neighbour
+    sum) so that anisotropic couplings are still handled exactly.
+
+    The exponents are clamped at 0 before exponentiating, which is just the min(1, exp(-beta*dE)) of
+    the Metropolis acceptance, so none of the acceptance probabilities change; it keeps exp() from
+    overflowing to inf at low temperatures, since the compiled kernels are built with
+    fastmath = True and so may assume that they never see an infinity. '''
+
+
+# This function tabulates the previous, next, and dist-th following column and row of every site, with periodic boundary conditions.
+def neighbour_tables(x_size, y_size, dist):
+    nbr_x = numpy.empty(shape = [3, x_size], dtype = numpy.int32)
+    nbr_y = numpy.empty(shape = [3, y_size], dtype = numpy.int32)
+
+    for x in xrange(x_size):
+        nbr_x[0, x] = (x - 1) % x_size
+        nbr_x[1, x] = (x + 1) % x_size
+        nbr_x[2, x] = (x + dist) % x_size
+
     for y in xrange(y_size):
-        for x in xrange(x_size):
-            dE = 0.0
-            dE += h * lat[y][x]
-            dE += Jx * lat[y][(x-1) % x_size] * lat[y][x]
-            dE += Jx * lat[y][(x+1) % x_size] * lat[y][x]
-            dE += Jy * lat[(y-1) % y_size][x] * lat[y][x]
-            dE += Jy * lat[(y+1) % y_size][x] * lat[y][x]
-            if random.random() < math.exp(-2*beta*dE):
-                lat[y][x] = -lat[y][x]
+        nbr_y[0, y] = (y - 1) % y_size
+        nbr_y[1, y] = (y + 1) % y_size
+        nbr_y[2, y] = (y + dist) % y_size
+
+    return (nbr_x, nbr_y)
+
+''' These are built once per call to many_MC(), so the compiled kernels below look up a site's
+    neighbours rather than recomputing the periodic wrap-around for every site of every sweep. '''
+
+
+# This function performs a single Monte Carlo update.
+@numba.njit("int8[:, ::1](int8[:, ::1], float64[:, :, ::1], int32[:, ::1], int32[:, ::1])", cache = True, nogil = True, fastmath = True)
+def MC_update(lat, probs, nbr_x, nbr_y):
+    y_size, x_size = lat.shape
+    rands = numpy.random.random((y_size, x_size))
+
+    for colour in xrange(2):
+        for y in xrange(y_size):
+            y_prev = nbr_y[0, y]
+            y_next = nbr_y[1, y]
+
+            for x in xrange((y + colour) & 1, x_size, 2):
+                x_sum = lat[y, nbr_x[0, x]] + lat[y, nbr_x[1, x]]
+                y_sum = lat[y_prev, x] + lat[y_next, x]
+
+                if rands[y, x] < probs[(lat[y, x] + 1) >> 1, (x_sum + 2) >> 1, (y_sum + 2) >> 1]:
+                    lat[y, x] = -lat[y, x]
 
     return lat
 
@@ -102,130 +136,161 @@ def MC_update(lat, h, Jx, Jy, T):
     E > 0, it suffices to compare the result of random.random() with exp(-2*beta*h*spin). This is 
     the standard thing we do with the Metropolis-Hastings algorithm, but exploiting the fact that
     exp(0) = 1 simplifies matters, since it lets us collapse the min(1, exp(-a)) comparison into a
-    single line. '''
+    single line.
 
+    Note that the sweep is split into a checkerboard: we first update every site with (x + y) even,
+    then every site with (x + y) odd. All four neighbours of a site have the other colour, so the
+    updates within a colour are independent of one another and the inner loop carries no dependence
+    from one site to the next. On lattices with an odd side length the colours meet at the periodic
+    boundary; since we still update the sites of a colour one at a time, the sweep remains a valid
+    Metropolis sweep in that case, just not a perfectly decoupled one.
 
-# This function retrieves the magnetisation, energy, and kth nearest-neighbour two-point Green function of a given lattice.
-def lat_props(trel, mu, ccx, ccy, temp, dist, conn):
-    net_M = 0.0
-    net_E = 0.0
-    net_corr = 0.0
-    
-    x_size = len(trel[0])
-    y_size = len(trel)
-    
-    sites = float(x_size * y_size)
+    The uniform random numbers for the whole sweep are drawn in a single call at the start of the
+    sweep, rather than one call per site. '''
+
+
+# This function retrieves the net magnetisation, the nearest-neighbour bond sums, and the kth nearest-neighbour spin products of a lattice, one site at a time.
+@numba.njit("UniTuple(int64, 4)(int8[:, ::1], int32[:, ::1], int32[:, ::1], boolean)", cache = True, nogil = True, fastmath = True)
+def lat_sums(trel, nbr_x, nbr_y, compute_G):
+    y_size, x_size = trel.shape
+
+    net_M = 0
+    bonds_x = 0
+    bonds_y = 0
+    net_corr = 0
 
     for y_pt in xrange(y_size):
         for x_pt in xrange(x_size):
-            curr_site = trel[y_pt][x_pt]
-            next_site_down = trel[(y_pt + dist) % y_size][x_pt]
-            next_site_right = trel[y_pt][(x_pt + dist) % x_size]
-            
+            curr_site = trel[y_pt, x_pt]
+
             net_M += curr_site
-            
-            net_E += -mu * curr_site
-            net_E += -ccx * trel[y_pt][(x_pt + 1) % x_size] * curr_site
-            net_E += -ccy * trel[(y_pt + 1) % y_size][x_pt] * curr_site
-            
-            net_corr += curr_site * next_site_down
-            net_corr += curr_site * next_site_right
-            
-    
-    lat_m = net_M / sites
-    lat_e = net_E / sites
-    disc_corr_func = net_corr / sites
-    conn_corr_func = disc_corr_func - (lat_m ** 2.0)
-    
-    if conn == True:
-        return (net_M, lat_m, net_E, lat_e, conn_corr_func)
-    
-    elif conn == False:
-        return (net_M, lat_m, net_E, lat_e, disc_corr_func)
-    
-    else:
-        raise TypeError("'conn' must be of type bool")
 
-''' Note that this gives either the kth nearest-neighbour two-point connected correlation function
-    (i.e. G^(2)_c(i, i+k) = <x_i x_(i+k)> - <x_i><x_(i+k)>) or the kth nearest-neighbour two-point
-    disconnected correlation function (i.e. G^(2)(i, i+k) = <x_i x_(i+k)>), depending on whether or
-    not we have conn = True or conn = False. Since <x_i> = <x_(i+k)> = m (the average per-site
-    magnetisation), the two-point connected correlation function just substitutes m^2 for
-    <x_i><x_(i+k)>. '''
+            bonds_x += trel[y_pt, nbr_x[1, x_pt]] * curr_site
+            bonds_y += trel[nbr_y[1, y_pt], x_pt] * curr_site
+
+            if compute_G:
+                net_corr += trel[nbr_y[2, y_pt], x_pt] * curr_site
+                net_corr += trel[y_pt, nbr_x[2, x_pt]] * curr_site
+
+    return (net_M, bonds_x, bonds_y, net_corr)
 
 
-# This function performs the MC thermalisation.
-def MC_thermal(collec, therm_steps, mag_field, couplx, couply, t):
-    now_collec = collec
+# This function performs the MC thermalisation of a single sample, and then retrieves its net magnetisation, net energy, and kth nearest-neighbour spin products.
+@numba.njit("Tuple((int64, float64, int64))(int8[:, ::1], float64[:, :, ::1], int32[:, ::1], int32[:, ::1], int64, float64, float64, float64, boolean)", cache = True, nogil = True, fastmath = True)
+def run_sample(lat, probs, nbr_x, nbr_y, therm_steps, h, Jx, Jy, compute_G):
+    for indiv_step in xrange(therm_steps + 1):
+        MC_update(lat, probs, nbr_x, nbr_y)
 
-    for indiv_step in xrange(therm_steps):
-        now_collec = MC_update(now_collec, mag_field, couplx, couply, t)        
+    net_M, bonds_x, bonds_y, net_corr = lat_sums(lat, nbr_x, nbr_y, compute_G)
+    net_E = -h * net_M - Jx * bonds_x - Jy * bonds_y
 
-    return now_collec
+    return (net_M, net_E, net_corr)
+
+''' This does the therm_steps thermalisation sweeps, the sweep that produces the sample, and the
+    measurement of the sample in one compiled call, so the lattice never goes back to Python in
+    between. The measurement is a separate pass after the last sweep rather than being folded into
+    it, since a site's bonds can only be counted once both of its neighbours have been updated.
+
+    The compiled kernels are given explicit type signatures, so Numba compiles each of them exactly
+    once, when the script starts, rather than on first call; integer values of h, Jx, or Jy are then
+    converted to float64 rather than triggering a second compilation. Together with cache = True, the
+    compiled machine code is written to disk, so later runs load it instead of compiling again. '''
 
 
 # This function performs several Monte Carlo updates, with the number of Monte Carlo updates specified by MC_iter.
-def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample, many_MC_G_dist, many_MC_G_corr):
-    MC_M = [0] * MC_iter
-    MC_E = [0] * MC_iter
-    MC_G = [0] * MC_iter
+def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample, many_MC_G_dist, many_MC_G_corr, many_MC_probs = None, many_MC_compute_G = True):
+    MC_M = numpy.zeros(MC_iter, dtype = numpy.int64)
+    MC_E = numpy.zeros(MC_iter, dtype = numpy.float64)
+    sum_M = 0
+    sum_M2 = 0
+    sum_E = 0.0
+    sum_E2 = 0.0
+    sum_G = 0.0
     
-    x_dist = len(array[0])
-    y_dist = len(array)
+    y_dist, x_dist = numpy.shape(array)
     points = float(x_dist * y_dist)
+    inv_points = 1.0 / points
 
     b = 1.0/tepl
+    probs = many_MC_probs if many_MC_probs is not None else accept_probs(ext_field, cc_x, cc_y, tepl)
+
+    if many_MC_G_corr != True and many_MC_G_corr != False:
+        raise TypeError("'many_MC_G_corr' must be of type bool")
 
-    now_lat = array
+    conn_weight = 1.0 if many_MC_G_corr == True else 0.0
+
+    now_lat = numpy.ascontiguousarray(array, dtype = numpy.int8)
+    nbr_x, nbr_y = neighbour_tables(x_dist, y_dist, many_MC_G_dist)
     
     for update in xrange(MC_iter):
-        now_lat = MC_thermal(now_lat, therm_steps_per_sample, ext_field, cc_x, cc_y, tepl)
-        now_update = MC_update(now_lat, ext_field, cc_x, cc_y, tepl)
-        now_props = lat_props(now_update, ext_field, cc_x, cc_y, tepl, many_MC_G_dist, many_MC_G_corr)
-        now_lat = now_update
+        net_M, net_E, net_corr = run_sample(now_lat, probs, nbr_x, nbr_y, therm_steps_per_sample, ext_field, cc_x, cc_y, many_MC_compute_G)
         
-        MC_M[update] = now_props[0]
-        MC_E[update] = now_props[2]
-        MC_G[update] = now_props[4]
+        MC_M[update] = net_M
+        MC_E[update] = net_E
+
+        sum_M += net_M
+        sum_M2 += net_M * net_M
+        sum_E += net_E
+        sum_E2 += net_E * net_E
+        sum_G += net_corr * inv_points - conn_weight * (net_M * inv_points) ** 2.0
     
-    avg_M = numpy.mean(MC_M, axis = None)
-    avg_m = float(avg_M / points)
-    avg_E = numpy.mean(MC_E, axis = None)
-    avg_e = float(avg_E / points)
-    avg_G = numpy.mean(MC_G, axis = None)
+    inv_iter = 1.0 / MC_iter
+
+    avg_M = sum_M * inv_iter
+    avg_m = float(avg_M * inv_points)
+    avg_E = sum_E * inv_iter
+    avg_e = float(avg_E * inv_points)
+    avg_G = sum_G * inv_iter if many_MC_compute_G else float('nan')
+
+    var_M = sum_M2 * inv_iter - avg_M ** 2.0
+    var_E = sum_E2 * inv_iter - avg_E ** 2.0
     
-    cv = math.pow(b, 2) * numpy.var(MC_E, axis = None) / points
+    cv = b * b * var_E * inv_points
 
     if ext_field != 0.0:
-        sus = b * numpy.var(MC_M, axis = None) / points
+        sus = b * var_M * inv_points
     else:
-        sus = b * numpy.var(MC_M, axis = None) / (points ** 2.0)
+        sus = b * var_M * inv_points * inv_points
     
-    return (now_lat, avg_M, avg_m, avg_E, avg_e, avg_G, sus, cv, MC_M, MC_E, MC_G)
+    return (now_lat, avg_M, avg_m, avg_E, avg_e, avg_G, sus, cv, MC_M, MC_E)
 
 ''' We need to do this for the susceptibility in the case of h = 0 because in this specific case, we
     have no interactions whatsoever. Thus, we're looking at the standard deviation of a set of ±1
     values picked at random; since there's no scale dependence, multiplying by array_sites in this
     specific case will give us an extraneous factor of array_sites. To write cv in terms of the
     total energy rather than the per-site energy, we have:
-    cv = (math.pow(b, 2) * (avg_E2 - math.pow(avg_E, 2))) / array_sites. '''
+    cv = (math.pow(b, 2) * (avg_E2 - math.pow(avg_E, 2))) / array_sites.
+
+    The averages and variances are built from running sums of M, M^2, E, E^2, and G, accumulated
+    as each sample comes back from run_sample(), rather than from separate passes over the stored
+    samples afterwards.
+
+    A caller that already has the acceptance table for (ext_field, cc_x, cc_y, tepl) can pass it in
+    as many_MC_probs, so that it isn't rebuilt; otherwise many_MC() builds it itself. Callers that
+    don't use the Green function can pass many_MC_compute_G = False to skip the kth nearest-neighbour
+    products entirely, in which case avg_G comes back as NaN.
+
+    avg_G is either the kth nearest-neighbour two-point connected correlation function (i.e.
+    G^(2)_c(i, i+k) = <x_i x_(i+k)> - <x_i><x_(i+k)>) or the kth nearest-neighbour two-point
+    disconnected correlation function (i.e. G^(2)(i, i+k) = <x_i x_(i+k)>), depending on whether we
+    have many_MC_G_corr = True or many_MC_G_corr = False. Since <x_i> = <x_(i+k)> = m (the average
+    per-site magnetisation), the connected function just substitutes m^2 for <x_i><x_(i+k)>. '''
 
 
 # This section creates and plots the histograms of the average total energy and average total magnetisation of each generated lattice.
 def MC_hist(grid, MC_steps, mag_mom, coupl_x, coupl_y, tymherr, bin_size, hist_therm_steps, MC_hist_G_dist, MC_hist_G_corr):
-    MC_results = many_MC(grid, MC_steps, mag_mom, coupl_x, coupl_y, tymherr, hist_therm_steps, MC_hist_G_dist, MC_hist_G_corr)
-
-    MC_int_M_array = numpy.rint(MC_results[8])
-    M_range = numpy.arange(min(MC_int_M_array), max(MC_int_M_array) + bin_size + 1, bin_size)
-    M_hist = numpy.histogram(MC_int_M_array, bins = M_range)
-    M_hist_x = numpy.delete(M_hist[1], len(M_hist[1]) - 1, axis = None)
-    M_hist_y = M_hist[0]
-
-    MC_int_E_array = numpy.rint(MC_results[9])
-    E_range = numpy.arange(min(MC_int_E_array), max(MC_int_E_array) + bin_size + 1, bin_size)
-    E_hist = numpy.histogram(MC_int_E_array, bins = E_range)
-    E_hist_x = numpy.delete(E_hist[1], len(E_hist[1]) - 1, axis = None)
-    E_hist_y = E_hist[0]
+    hist_probs = accept_probs(mag_mom, coupl_x, coupl_y, tymherr)
+    MC_results = many_MC(grid, MC_steps, mag_mom, coupl_x, coupl_y, tymherr, hist_therm_steps, MC_hist_G_dist, MC_hist_G_corr, hist_probs, False)
+
+    MC_int_M_array = MC_results[8]
+    M_min = MC_int_M_array.min()
+    M_hist_y = numpy.bincount(((MC_int_M_array - M_min) // bin_size).astype(numpy.int64))
+    M_hist_x = M_min + bin_size * numpy.arange(len(M_hist_y))
+
+    MC_int_E_array = numpy.rint(MC_results[9]).astype(numpy.int64)
+    E_min = MC_int_E_array.min()
+    E_hist_y = numpy.bincount(((MC_int_E_array - E_min) // bin_size).astype(numpy.int64))
+    E_hist_x = E_min + bin_size * numpy.arange(len(E_hist_y))
     
     matplotlib.pyplot.figure(1)
     matplotlib.pyplot.suptitle("Magnetisation Histogram", family = "Gill Sans MT", fontsize = 16)
@@ -241,6 +306,11 @@ def MC_hist(grid, MC_steps, mag_mom, coupl_x, coupl_y, tymherr, bin_size, hist_t
 
     return (MC_results[8], MC_results[9], M_hist_x, M_hist_y, E_hist_x, E_hist_y)
 
+''' Since the total magnetisation is always an integer, and we round the total energy to one, the
+    histograms are integer-valued, with bins of width bin_size starting from the smallest value seen.
+    We can therefore compute each sample's bin index directly and count them with numpy.bincount,
+    rather than having numpy.histogram search an array of bin edges for every sample. '''
+
 
 # Here, we run the simulation. For testing, we also print the actual arrays; these commands are then commented out as necessary.
 print "Initial 2D Ising Grid:"
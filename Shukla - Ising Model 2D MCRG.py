@@ -48,7 +48,7 @@ kNN_2pt_G_conn = False       # kNN_2pt_G_conn tells us whether we're looking at
 
 
 # This section creates the initial system, a static 2D array of spins (up or down).
-initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
+initial_grid = 2 * numpy.random.randint(0, 2, size = [y_len, x_len], dtype = numpy.int8) - 1
 
 ''' Note that this is faster than my original choice of how to initialise the system: 
     initial_grid = [[-1.0 if random.random() <= 0.5 else 1.0 for cube in xrange(x_len)] for row in xrange(y_len)] '''
@@ -56,44 +56,32 @@ initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
 
 # This function provides a printed version of the 2D Ising grid.
 def print_grid(grating):
-    Ising_grid_printed = []
+    grating = numpy.asarray(grating)
+    assert numpy.all(numpy.abs(grating) == 1), "Ising spin must be +1.0 or -1.0"
 
-    for chain in grating:
-        IG_single_row = []
+    IG_chars = numpy.where(grating > 0, "+", "-")
+    Ising_grid_printed = [" ".join(IG_single_row) for IG_single_row in IG_chars]
 
-        for entry in chain:
-            if entry == -1.0:
-                IG_single_row += ["-"]
-            elif entry == +1.0:
-                IG_single_row += ["+"]
-            else:
-                raise ArithmeticError("Ising spin must be +1.0 or -1.0")
-
-        IG_single_row_printed = " ".join(IG_single_row)
-        Ising_grid_printed += [IG_single_row_printed]
-
-    for IG_row in Ising_grid_printed:
-        print IG_row
+    print "\n".join(Ising_grid_printed)
     
     return Ising_grid_printed
 
 
 # This function performs a single Monte Carlo update.
 def MC_update(lat, h, Jx, Jy, T):
-    x_size = len(lat[0])
-    y_size = len(lat)
+    y_size, x_size = lat.shape
     beta = 1.0 / T
 
     for y in xrange(y_size):
         for x in xrange(x_size):
             dE = 0.0
-            dE += h * lat[y][x]
-            dE += Jx * lat[y][(x-1) % x_size] * lat[y][x]
-            dE += Jx * lat[y][(x+1) % x_size] * lat[y][x]
-            dE += Jy * lat[(y-1) % y_size][x] * lat[y][x]
-            dE += Jy * lat[(y+1) % y_size][x] * lat[y][x]
+            dE += h * lat[y, x]
+            dE += Jx * lat[y, (x-1) % x_size] * lat[y, x]
+            dE += Jx * lat[y, (x+1) % x_size] * lat[y, x]
+            dE += Jy * lat[(y-1) % y_size, x] * lat[y, x]
+            dE += Jy * lat[(y+1) % y_size, x] * lat[y, x]
             if random.random() < math.exp(-2*beta*dE):
-                lat[y][x] = -lat[y][x]
+                lat[y, x] = -lat[y, x]
 
     return lat
 
@@ -107,30 +95,17 @@ def MC_update(lat, h, Jx, Jy, T):
 
 # This function retrieves the magnetisation, energy, and kth nearest-neighbour two-point Green function of a given lattice.
 def lat_props(trel, mu, ccx, ccy, temp, dist, conn):
-    net_M = 0.0
-    net_E = 0.0
-    net_corr = 0.0
-    
-    x_size = len(trel[0])
-    y_size = len(trel)
+    trel = numpy.asarray(trel, dtype = numpy.int64)
+    y_size, x_size = trel.shape
     
     sites = float(x_size * y_size)
 
-    for y_pt in xrange(y_size):
-        for x_pt in xrange(x_size):
-            curr_site = trel[y_pt][x_pt]
-            next_site_down = trel[(y_pt + dist) % y_size][x_pt]
-            next_site_right = trel[y_pt][(x_pt + dist) % x_size]
-            
-            net_M += curr_site
-            
-            net_E += -mu * curr_site
-            net_E += -ccx * trel[y_pt][(x_pt + 1) % x_size] * curr_site
-            net_E += -ccy * trel[(y_pt + 1) % y_size][x_pt] * curr_site
-            
-            net_corr += curr_site * next_site_down
-            net_corr += curr_site * next_site_right
-            
+    net_M = int(trel.sum())
+    bonds_x = int((trel * numpy.roll(trel, -1, axis = 1)).sum())
+    bonds_y = int((trel * numpy.roll(trel, -1, axis = 0)).sum())
+    net_corr = int((trel * numpy.roll(trel, -dist, axis = 0)).sum() + (trel * numpy.roll(trel, -dist, axis = 1)).sum())
+    
+    net_E = -mu * net_M - ccx * bonds_x - ccy * bonds_y
     
     lat_m = net_M / sites
     lat_e = net_E / sites
@@ -151,7 +126,14 @@ def lat_props(trel, mu, ccx, ccy, temp, dist, conn):
     disconnected correlation function (i.e. G^(2)(i, i+k) = <x_i x_(i+k)>), depending on whether or
     not we have conn = True or conn = False. Since <x_i> = <x_(i+k)> = m (the average per-site
     magnetisation), the two-point connected correlation function just substitutes m^2 for
-    <x_i><x_(i+k)>. '''
+    <x_i><x_(i+k)>.
+
+    The sums are taken over whole shifted copies of the lattice via numpy.roll, rather than site by
+    site in Python: numpy.roll(trel, -1, axis = 1)[y, x] is the right-hand neighbour trel[y, x + 1]
+    (with periodic boundary conditions), and likewise for the neighbour below and the kth neighbours.
+    The magnetisation, the bond sums, and the spin products are all integers for ±1 spins, so we sum
+    them as integers (in int64, so that the int8 lattice can't overflow) and only bring in the
+    (floating-point) field and couplings once, at the end. '''
 
 
 # This function performs the MC thermalisation.
@@ -170,19 +152,16 @@ def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample,
     MC_E = [0] * MC_iter
     MC_G = [0] * MC_iter
     
-    x_dist = len(array[0])
-    y_dist = len(array)
+    y_dist, x_dist = numpy.shape(array)
     points = float(x_dist * y_dist)
 
     b = 1.0/tepl
 
-    now_lat = array
+    now_lat = numpy.ascontiguousarray(array, dtype = numpy.int8)
     
     for update in xrange(MC_iter):
-        now_lat = MC_thermal(now_lat, therm_steps_per_sample, ext_field, cc_x, cc_y, tepl)
-        now_update = MC_update(now_lat, ext_field, cc_x, cc_y, tepl)
-        now_props = lat_props(now_update, ext_field, cc_x, cc_y, tepl, many_MC_G_dist, many_MC_G_corr)
-        now_lat = now_update
+        now_lat = MC_thermal(now_lat, therm_steps_per_sample + 1, ext_field, cc_x, cc_y, tepl)
+        now_props = lat_props(now_lat, ext_field, cc_x, cc_y, tepl, many_MC_G_dist, many_MC_G_corr)
         
         MC_M[update] = now_props[0]
         MC_E[update] = now_props[2]
@@ -213,15 +192,14 @@ def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample,
 
 # This function performs a single renormalisation reduction.
 def reduction(grid, x_reduce_factor, y_reduce_factor):
-    if len(grid) % y_reduce_factor != 0 or len(grid[0]) % x_reduce_factor != 0:
+    if grid.shape[0] % y_reduce_factor != 0 or grid.shape[1] % x_reduce_factor != 0:
         raise ArithmeticError("reduce_factor for a given direction must be an integer factor of that direction's length")
     
     else:
-        x_len = len(grid[0])
-        y_len = len(grid)
+        y_len, x_len = grid.shape
         x_len_new = x_len / x_reduce_factor
         y_len_new = y_len / y_reduce_factor
-        reduced_grid = numpy.zeros(shape = [y_len_new, x_len_new])
+        reduced_grid = numpy.zeros(shape = [y_len_new, x_len_new], dtype = numpy.int8)
         
         for spin_block_y in xrange(0, y_len, y_reduce_factor):
             for spin_block_x in xrange(0, x_len, x_reduce_factor):
@@ -229,12 +207,12 @@ def reduction(grid, x_reduce_factor, y_reduce_factor):
                 
                 for y_site_place in xrange(spin_block_y, spin_block_y + y_reduce_factor):
                     for x_site_place in xrange(spin_block_x, spin_block_x + x_reduce_factor):
-                        block_net_spin += grid[y_site_place][x_site_place]
+                        block_net_spin += int(grid[y_site_place, x_site_place])
                 
-                reduced_grid[spin_block_y // y_reduce_factor][spin_block_x // x_reduce_factor] = numpy.sign(block_net_spin)
+                reduced_grid[spin_block_y // y_reduce_factor, spin_block_x // x_reduce_factor] = numpy.sign(block_net_spin)
                 
-                if int(reduced_grid[spin_block_y // y_reduce_factor][spin_block_x // x_reduce_factor]) == 0:
-                    reduced_grid[spin_block_y // y_reduce_factor][spin_block_x // x_reduce_factor] = numpy.random.choice([-1, 1])
+                if int(reduced_grid[spin_block_y // y_reduce_factor, spin_block_x // x_reduce_factor]) == 0:
+                    reduced_grid[spin_block_y // y_reduce_factor, spin_block_x // x_reduce_factor] = numpy.random.choice([-1, 1])
         
         return reduced_grid
 
@@ -7,10 +7,11 @@
 
 
 # This section imports the libraries necessary to run the program.
-import math
 import matplotlib
+import multiprocessing
+import multiprocessing.pool
+import numba
 import numpy
-import random
 import time
 import tabulate
 
@@ -51,9 +52,13 @@ Jy_end = 1.0                 # Jy_end is the ending y-direction coupling constan
 kNN_2pt_G_dist = 1           # kNN_2pt_G_dist is the distance at which we're looking at the kth nearest-neighbour two-point Green function.
 kNN_2pt_G_conn = False       # kNN_2pt_G_conn tells us whether we're looking at the two-point disconnected or the two-point connected Green function.
 
+PT_swap_every = 0            # PT_swap_every is the number of samples between parallel tempering swaps of neighbouring 1NN sweep points (0 for no swaps).
+
+n_cores = multiprocessing.cpu_count()     # n_cores is the number of threads the 0NN parameter sweep is spread over.
+
 
 # This section creates the initial system, a static 2D array of spins (up or down).
-initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
+initial_grid = 2 * numpy.random.randint(0, 2, size = [y_len, x_len], dtype = numpy.int8) - 1
 
 ''' Note that this is faster than my original choice of how to initialise the system: 
     initial_grid = [[-1.0 if random.random() <= 0.5 else 1.0 for cube in xrange(x_len)] for row in xrange(y_len)] '''
@@ -61,44 +66,87 @@ initial_grid = numpy.random.choice([-1, 1], size = [y_len, x_len])
 
 # This function provides a printed version of the 2D Ising grid.
 def print_grid(grating):
-    Ising_grid_printed = []
-
-    for chain in grating:
-        IG_single_row = []
-
-        for entry in chain:
-            if entry == -1.0:
-                IG_single_row += ["-"]
-            elif entry == +1.0:
-                IG_single_row += ["+"]
-            else:
-                raise ArithmeticError("Ising spin must be +1.0 or -1.0")
+    grating = numpy.asarray(grating)
+    assert numpy.all(numpy.abs(grating) == 1), "Ising spin must be +1.0 or -1.0"
 
-        IG_single_row_printed = " ".join(IG_single_row)
-        Ising_grid_printed += [IG_single_row_printed]
+    IG_chars = numpy.where(grating > 0, "+", "-")
+    Ising_grid_printed = [" ".join(IG_single_row) for IG_single_row in IG_chars]
 
-    for IG_row in Ising_grid_printed:
-        print IG_row
+    print "\n".join(Ising_grid_printed)
     
     return Ising_grid_printed
 
 
-# This function performs a single Monte Carlo update.
-def MC_update(lat, h, Jx, Jy, T):
-    x_size = len(lat[0])
-    y_size = len(lat)
+# This function tabulates the Metropolis acceptance probabilities for every local environment of a site.
+def accept_probs(h, Jx, Jy, T):
     beta = 1.0 / T
 
+    spins = numpy.array([-1.0, 1.0]).reshape(2, 1, 1)
+    nbr_sums = numpy.array([-2.0, 0.0, 2.0])
+    local_fields = h + Jx * nbr_sums.reshape(3, 1) + Jy * nbr_sums.reshape(1, 3)
+
+    probs = numpy.exp(numpy.minimum((-2.0 * beta) * spins * local_fields, 0.0))
+
+    return probs
+
+''' Since the spins are ±1, the x-direction and y-direction neighbour sums can only be -2, 0, or 2,
+    so for a given (h, Jx, Jy, T) there are only 18 distinct values of exp(-2*beta*dE); 9 for each
+    spin. The table is indexed as probs[(spin + 1) >> 1, (x_sum + 2) >> 1, (y_sum + 2) >> 1]. We
+    keep the x-direction and y-direction sums separate (rather than tabulating the total neighbour
+    sum) so that anisotropic couplings are still handled exactly.
+
+    The exponents are clamped at 0 before exponentiating, which is just the min(1, exp(-beta*dE)) of
+    the Metropolis acceptance, so none of the acceptance probabilities change; it keeps exp() from
+    overflowing to inf at low temperatures, since the compiled kernels are built with
+    fastmath = True and so may assume that they never see an infinity. '''
+
+
+# This function tabulates the previous, next, and dist-th following column and row of every site, with periodic boundary conditions.
+def neighbour_tables(x_size, y_size, dist):
+    nbr_x = numpy.empty(shape = [3, x_size], dtype = numpy.int32)
+    nbr_y = numpy.empty(shape = [3, y_size], dtype = numpy.int32)
+
+    for x in xrange(x_size):
+        nbr_x[0, x] = (x - 1) % x_size
+        nbr_x[1, x] = (x + 1) % x_size
+        nbr_x[2, x] = (x + dist) % x_size
+
     for y in xrange(y_size):
-        for x in xrange(x_size):
-            dE = 0.0
-            dE += h * lat[y][x]
-            dE += Jx * lat[y][(x-1) % x_size] * lat[y][x]
-            dE += Jx * lat[y][(x+1) % x_size] * lat[y][x]
-            dE += Jy * lat[(y-1) % y_size][x] * lat[y][x]
-            dE += Jy * lat[(y+1) % y_size][x] * lat[y][x]
-            if random.random() < math.exp(-2*beta*dE):
-                lat[y][x] = -lat[y][x]
+        nbr_y[0, y] = (y - 1) % y_size
+        nbr_y[1, y] = (y + 1) % y_size
+        nbr_y[2, y] = (y + dist) % y_size
+
+    return (nbr_x, nbr_y)
+
+''' These are built once per call to many_MC(), so the compiled kernels below look up a site's
+    neighbours rather than recomputing the periodic wrap-around for every site of every sweep. '''
+
+
+# This function performs a single checkerboard sweep of the lattice, given a uniform random number for every site.
+@numba.njit("void(int8[:, ::1], float64[:, :, ::1], int32[:, ::1], int32[:, ::1], float64[:, ::1])", cache = True, nogil = True, fastmath = True)
+def checkerboard_sweep(lat, probs, nbr_x, nbr_y, rands):
+    y_size, x_size = lat.shape
+
+    for colour in xrange(2):
+        for y in xrange(y_size):
+            y_prev = nbr_y[0, y]
+            y_next = nbr_y[1, y]
+
+            for x in xrange((y + colour) & 1, x_size, 2):
+                x_sum = lat[y, nbr_x[0, x]] + lat[y, nbr_x[1, x]]
+                y_sum = lat[y_prev, x] + lat[y_next, x]
+
+                if rands[y, x] < probs[(lat[y, x] + 1) >> 1, (x_sum + 2) >> 1, (y_sum + 2) >> 1]:
+                    lat[y, x] = -lat[y, x]
+
+
+# This function performs a single Monte Carlo update.
+@numba.njit("int8[:, ::1](int8[:, ::1], float64[:, :, ::1], int32[:, ::1], int32[:, ::1])", cache = True, nogil = True, fastmath = True)
+def MC_update(lat, probs, nbr_x, nbr_y):
+    y_size, x_size = lat.shape
+    rands = numpy.random.random((y_size, x_size))
+
+    checkerboard_sweep(lat, probs, nbr_x, nbr_y, rands)
 
     return lat
 
@@ -107,113 +155,347 @@ def MC_update(lat, h, Jx, Jy, T):
     E > 0, it suffices to compare the result of random.random() with exp(-2*beta*h*spin). This is 
     the standard thing we do with the Metropolis-Hastings algorithm, but exploiting the fact that
     exp(0) = 1 simplifies matters, since it lets us collapse the min(1, exp(-a)) comparison into a
-    single line. '''
+    single line.
 
+    Note that the sweep is split into a checkerboard: we first update every site with (x + y) even,
+    then every site with (x + y) odd. All four neighbours of a site have the other colour, so the
+    updates within a colour are independent of one another and the inner loop carries no dependence
+    from one site to the next. On lattices with an odd side length the colours meet at the periodic
+    boundary; since we still update the sites of a colour one at a time, the sweep remains a valid
+    Metropolis sweep in that case, just not a perfectly decoupled one.
 
-# This function retrieves the magnetisation, energy, and kth nearest-neighbour two-point Green function of a given lattice.
-def lat_props(trel, mu, ccx, ccy, temp, dist, conn):
-    net_M = 0.0
-    net_E = 0.0
-    net_corr = 0.0
-    
-    x_size = len(trel[0])
-    y_size = len(trel)
-    
-    sites = float(x_size * y_size)
+    The uniform random numbers for the whole sweep are drawn in a single call at the start of the
+    sweep, rather than one call per site, and handed to checkerboard_sweep(). Keeping the draw
+    separate from the sweep itself also lets run_replicas() below fill them from a separate random
+    number stream for each replica. '''
+
+
+# This function retrieves the net magnetisation, the nearest-neighbour bond sums, and the kth nearest-neighbour spin products of a lattice, one site at a time.
+@numba.njit("UniTuple(int64, 4)(int8[:, ::1], int32[:, ::1], int32[:, ::1], boolean)", cache = True, nogil = True, fastmath = True)
+def lat_sums(trel, nbr_x, nbr_y, compute_G):
+    y_size, x_size = trel.shape
+
+    net_M = 0
+    bonds_x = 0
+    bonds_y = 0
+    net_corr = 0
 
     for y_pt in xrange(y_size):
         for x_pt in xrange(x_size):
-            curr_site = trel[y_pt][x_pt]
-            next_site_down = trel[(y_pt + dist) % y_size][x_pt]
-            next_site_right = trel[y_pt][(x_pt + dist) % x_size]
-            
+            curr_site = trel[y_pt, x_pt]
+
             net_M += curr_site
-            
-            net_E += -mu * curr_site
-            net_E += -ccx * trel[y_pt][(x_pt + 1) % x_size] * curr_site
-            net_E += -ccy * trel[(y_pt + 1) % y_size][x_pt] * curr_site
-            
-            net_corr += curr_site * next_site_down
-            net_corr += curr_site * next_site_right
-            
-    
-    lat_m = net_M / sites
-    lat_e = net_E / sites
-    disc_corr_func = net_corr / sites
-    conn_corr_func = disc_corr_func - (lat_m ** 2.0)
-    
-    if conn == True:
-        return (net_M, lat_m, net_E, lat_e, conn_corr_func)
-    
-    elif conn == False:
-        return (net_M, lat_m, net_E, lat_e, disc_corr_func)
-    
-    else:
-        raise TypeError("'conn' must be of type bool")
 
-''' Note that this gives either the kth nearest-neighbour two-point connected correlation function
-    (i.e. G^(2)_c(i, i+k) = <x_i x_(i+k)> - <x_i><x_(i+k)>) or the kth nearest-neighbour two-point
-    disconnected correlation function (i.e. G^(2)(i, i+k) = <x_i x_(i+k)>), depending on whether or
-    not we have conn = True or conn = False. Since <x_i> = <x_(i+k)> = m (the average per-site
-    magnetisation), the two-point connected correlation function just substitutes m^2 for
-    <x_i><x_(i+k)>. '''
+            bonds_x += trel[y_pt, nbr_x[1, x_pt]] * curr_site
+            bonds_y += trel[nbr_y[1, y_pt], x_pt] * curr_site
+
+            if compute_G:
+                net_corr += trel[nbr_y[2, y_pt], x_pt] * curr_site
+                net_corr += trel[y_pt, nbr_x[2, x_pt]] * curr_site
+
+    return (net_M, bonds_x, bonds_y, net_corr)
+
+
+# This function performs the MC thermalisation of a single sample, and then retrieves its net magnetisation, net energy, and kth nearest-neighbour spin products.
+@numba.njit("Tuple((int64, float64, int64))(int8[:, ::1], float64[:, :, ::1], int32[:, ::1], int32[:, ::1], int64, float64, float64, float64, boolean)", cache = True, nogil = True, fastmath = True)
+def run_sample(lat, probs, nbr_x, nbr_y, therm_steps, h, Jx, Jy, compute_G):
+    for indiv_step in xrange(therm_steps + 1):
+        MC_update(lat, probs, nbr_x, nbr_y)
 
+    net_M, bonds_x, bonds_y, net_corr = lat_sums(lat, nbr_x, nbr_y, compute_G)
+    net_E = -h * net_M - Jx * bonds_x - Jy * bonds_y
 
-# This function performs the MC thermalisation.
-def MC_thermal(collec, therm_steps, mag_field, couplx, couply, t):
-    now_collec = collec
+    return (net_M, net_E, net_corr)
 
-    for indiv_step in xrange(therm_steps):
-        now_collec = MC_update(now_collec, mag_field, couplx, couply, t)        
+''' This does the therm_steps thermalisation sweeps, the sweep that produces the sample, and the
+    measurement of the sample in one compiled call, so the lattice never goes back to Python in
+    between. The measurement is a separate pass after the last sweep rather than being folded into
+    it, since a site's bonds can only be counted once both of its neighbours have been updated.
 
-    return now_collec
+    The compiled kernels are given explicit type signatures, so Numba compiles each of them exactly
+    once, when the script starts, rather than on first call; integer values of h, Jx, or Jy are then
+    converted to float64 rather than triggering a second compilation. Together with cache = True, the
+    compiled machine code is written to disk, so later runs load it instead of compiling again. '''
+
+
+# This function fills buf with uniform random numbers from a single xorshift64* stream, and returns the new state of the stream.
+@numba.njit("uint64(float64[:, ::1], uint64)", cache = True, nogil = True, fastmath = True)
+def fill_stream(buf, state):
+    y_size, x_size = buf.shape
+
+    for y in xrange(y_size):
+        for x in xrange(x_size):
+            state ^= state >> numpy.uint64(12)
+            state ^= state << numpy.uint64(25)
+            state ^= state >> numpy.uint64(27)
+            buf[y, x] = ((state * numpy.uint64(2685821657736338717)) >> numpy.uint64(11)) * (1.0 / 9007199254740992.0)
+
+    return state
+
+''' The top 53 bits of each output are scaled into [0, 1), as numpy.random.random() does. The state
+    must be nonzero, since zero is a fixed point of the xorshift steps. '''
+
+
+# This function performs MC_iter samples of every replica in lats at once, each with its own acceptance table and Hamiltonian, and returns the running sums of the replicas' measurements.
+@numba.njit("Tuple((int64[::1], int64[::1], float64[::1], float64[::1], float64[::1]))(int8[:, :, ::1], float64[:, :, :, ::1], int32[:, ::1], int32[:, ::1], int64, int64, float64[::1], float64[::1], float64[::1], float64[::1], boolean, float64, int64, uint64[::1])", cache = True, parallel = True, fastmath = True)
+def run_replicas(lats, probs_all, nbr_x, nbr_y, MC_iter, therm_steps, hs, Jxs, Jys, betas, compute_G, conn_weight, swap_every, states):
+    reps, y_size, x_size = lats.shape
+    inv_points = 1.0 / (x_size * y_size)
+
+    rands = numpy.empty((reps, y_size, x_size))
+
+    net_M = numpy.zeros(reps, dtype = numpy.int64)
+    bonds_x = numpy.zeros(reps, dtype = numpy.int64)
+    bonds_y = numpy.zeros(reps, dtype = numpy.int64)
+
+    sum_M = numpy.zeros(reps, dtype = numpy.int64)
+    sum_M2 = numpy.zeros(reps, dtype = numpy.int64)
+    sum_E = numpy.zeros(reps)
+    sum_E2 = numpy.zeros(reps)
+    sum_G = numpy.zeros(reps)
+
+    block = swap_every if swap_every > 0 else MC_iter
+
+    for block_start in xrange(0, MC_iter, block):
+        block_end = min(block_start + block, MC_iter)
+
+        for rep in numba.prange(reps):
+            state = states[rep]
+            rep_M = 0
+            rep_bonds_x = 0
+            rep_bonds_y = 0
+            rep_sum_M = 0
+            rep_sum_M2 = 0
+            rep_sum_E = 0.0
+            rep_sum_E2 = 0.0
+            rep_sum_G = 0.0
+
+            for update in xrange(block_start, block_end):
+                for indiv_step in xrange(therm_steps + 1):
+                    state = fill_stream(rands[rep], state)
+                    checkerboard_sweep(lats[rep], probs_all[rep], nbr_x, nbr_y, rands[rep])
+
+                rep_M, rep_bonds_x, rep_bonds_y, rep_corr = lat_sums(lats[rep], nbr_x, nbr_y, compute_G)
+                rep_E = -hs[rep] * rep_M - Jxs[rep] * rep_bonds_x - Jys[rep] * rep_bonds_y
+
+                rep_sum_M += rep_M
+                rep_sum_M2 += rep_M * rep_M
+                rep_sum_E += rep_E
+                rep_sum_E2 += rep_E * rep_E
+                rep_sum_G += rep_corr * inv_points - conn_weight * (rep_M * inv_points) ** 2.0
+
+            states[rep] = state
+            net_M[rep] = rep_M
+            bonds_x[rep] = rep_bonds_x
+            bonds_y[rep] = rep_bonds_y
+
+            sum_M[rep] += rep_sum_M
+            sum_M2[rep] += rep_sum_M2
+            sum_E[rep] += rep_sum_E
+            sum_E2[rep] += rep_sum_E2
+            sum_G[rep] += rep_sum_G
+
+        if swap_every > 0:
+            for rep in xrange(reps - 1):
+                nxt = rep + 1
+
+                E_own = -hs[rep] * net_M[rep] - Jxs[rep] * bonds_x[rep] - Jys[rep] * bonds_y[rep]
+                E_nxt_own = -hs[nxt] * net_M[nxt] - Jxs[nxt] * bonds_x[nxt] - Jys[nxt] * bonds_y[nxt]
+                E_swap = -hs[rep] * net_M[nxt] - Jxs[rep] * bonds_x[nxt] - Jys[rep] * bonds_y[nxt]
+                E_nxt_swap = -hs[nxt] * net_M[rep] - Jxs[nxt] * bonds_x[rep] - Jys[nxt] * bonds_y[rep]
+
+                log_ratio = betas[rep] * (E_own - E_swap) + betas[nxt] * (E_nxt_own - E_nxt_swap)
+
+                if log_ratio >= 0.0 or numpy.random.random() < numpy.exp(log_ratio):
+                    swap_lat = lats[rep].copy()
+                    lats[rep][:, :] = lats[nxt]
+                    lats[nxt][:, :] = swap_lat
+
+                    net_M[rep], net_M[nxt] = net_M[nxt], net_M[rep]
+                    bonds_x[rep], bonds_x[nxt] = bonds_x[nxt], bonds_x[rep]
+                    bonds_y[rep], bonds_y[nxt] = bonds_y[nxt], bonds_y[rep]
+
+    return (sum_M, sum_M2, sum_E, sum_E2, sum_G)
+
+''' Each replica is an independent Markov chain with its own (h, Jx, Jy, T); the replicas share the
+    lattice shape, and so the neighbour tables. The replicas are spread over Numba's threads via
+    prange, and each thread runs its replicas through a whole block of samples (all of MC_iter when
+    there are no swaps) before coming back, so that the threads only meet once per block. Each
+    replica draws its uniform random numbers from its own xorshift64* stream, seeded from states,
+    into its own row of a buffer allocated once per call; the run is therefore reproducible from the
+    seeds no matter how the replicas are spread over the threads, and the random numbers cost no
+    more serial time than the sweeps themselves.
+
+    If swap_every > 0, then every swap_every samples we also propose to exchange the lattices of each
+    pair of neighbouring replicas (parallel tempering). Since neighbouring replicas can differ in h,
+    Jx, and Jy as well as in T, the swap is accepted with probability
+    min(1, exp(b_i*(H_i(x_i) - H_i(x_j)) + b_j*(H_j(x_j) - H_j(x_i)))), which is the familiar
+    min(1, exp((b_i - b_j)*(E_i - E_j))) when the replicas only differ in temperature. Every replica
+    still samples the Boltzmann distribution of its own parameters; the swaps just let
+    configurations from the high temperature replicas reach the low temperature ones, which mix
+    slowly on their own. '''
 
 
 # This function performs several Monte Carlo updates, with the number of Monte Carlo updates specified by MC_iter.
-def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample, many_MC_G_dist, many_MC_G_corr):
-    MC_M = [0] * MC_iter
-    MC_E = [0] * MC_iter
-    MC_G = [0] * MC_iter
+def many_MC(array, MC_iter, ext_field, cc_x, cc_y, tepl, therm_steps_per_sample, many_MC_G_dist, many_MC_G_corr, many_MC_probs = None, many_MC_compute_G = True):
+    sum_M = 0
+    sum_M2 = 0
+    sum_E = 0.0
+    sum_E2 = 0.0
+    sum_G = 0.0
     
-    x_dist = len(array[0])
-    y_dist = len(array)
+    y_dist, x_dist = numpy.shape(array)
     points = float(x_dist * y_dist)
+    inv_points = 1.0 / points
 
     b = 1.0/tepl
+    probs = many_MC_probs if many_MC_probs is not None else accept_probs(ext_field, cc_x, cc_y, tepl)
+
+    if many_MC_G_corr != True and many_MC_G_corr != False:
+        raise TypeError("'many_MC_G_corr' must be of type bool")
+
+    conn_weight = 1.0 if many_MC_G_corr == True else 0.0
 
-    now_lat = array
+    now_lat = numpy.ascontiguousarray(array, dtype = numpy.int8)
+    nbr_x, nbr_y = neighbour_tables(x_dist, y_dist, many_MC_G_dist)
     
     for update in xrange(MC_iter):
-        now_lat = MC_thermal(now_lat, therm_steps_per_sample, ext_field, cc_x, cc_y, tepl)
-        now_update = MC_update(now_lat, ext_field, cc_x, cc_y, tepl)
-        now_props = lat_props(now_update, ext_field, cc_x, cc_y, tepl, many_MC_G_dist, many_MC_G_corr)
-        now_lat = now_update
+        net_M, net_E, net_corr = run_sample(now_lat, probs, nbr_x, nbr_y, therm_steps_per_sample, ext_field, cc_x, cc_y, many_MC_compute_G)
         
-        MC_M[update] = now_props[0]
-        MC_E[update] = now_props[2]
-        MC_G[update] = now_props[4]
+        sum_M += net_M
+        sum_M2 += net_M * net_M
+        sum_E += net_E
+        sum_E2 += net_E * net_E
+        sum_G += net_corr * inv_points - conn_weight * (net_M * inv_points) ** 2.0
     
-    avg_M = numpy.mean(MC_M, axis = None)
-    avg_m = float(avg_M / points)
-    avg_E = numpy.mean(MC_E, axis = None)
-    avg_e = float(avg_E / points)
-    avg_G = numpy.mean(MC_G, axis = None)
+    inv_iter = 1.0 / MC_iter
+
+    avg_M = sum_M * inv_iter
+    avg_m = float(avg_M * inv_points)
+    avg_E = sum_E * inv_iter
+    avg_e = float(avg_E * inv_points)
+    avg_G = sum_G * inv_iter if many_MC_compute_G else float('nan')
+
+    var_M = sum_M2 * inv_iter - avg_M ** 2.0
+    var_E = sum_E2 * inv_iter - avg_E ** 2.0
     
-    cv = math.pow(b, 2) * numpy.var(MC_E, axis = None) / points
+    cv = b * b * var_E * inv_points
 
     if ext_field != 0.0:
-        sus = b * numpy.var(MC_M, axis = None) / points
+        sus = b * var_M * inv_points
     else:
-        sus = b * numpy.var(MC_M, axis = None) / (points ** 2.0)
+        sus = b * var_M * inv_points * inv_points
     
-    return (now_lat, avg_M, avg_m, avg_E, avg_e, avg_G, sus, cv, MC_M, MC_E, MC_G)
+    return (now_lat, avg_M, avg_m, avg_E, avg_e, avg_G, sus, cv)
 
 ''' We need to do this for the susceptibility in the case of h = 0 because in this specific case, we
     have no interactions whatsoever. Thus, we're looking at the standard deviation of a set of ±1
     values picked at random; since there's no scale dependence, multiplying by array_sites in this
     specific case will give us an extraneous factor of array_sites. To write cv in terms of the
     total energy rather than the per-site energy, we have:
-    cv = (math.pow(b, 2) * (avg_E2 - math.pow(avg_E, 2))) / array_sites. '''
+    cv = (math.pow(b, 2) * (avg_E2 - math.pow(avg_E, 2))) / array_sites.
+
+    The averages and variances are built from running sums of M, M^2, E, E^2, and G, accumulated
+    as each sample comes back from run_sample(), rather than from separate passes over the stored
+    samples afterwards.
+
+    A caller that already has the acceptance table for (ext_field, cc_x, cc_y, tepl) can pass it in
+    as many_MC_probs, so that it isn't rebuilt; otherwise many_MC() builds it itself. Callers that
+    don't use the Green function can pass many_MC_compute_G = False to skip the kth nearest-neighbour
+    products entirely, in which case avg_G comes back as NaN.
+
+    avg_G is either the kth nearest-neighbour two-point connected correlation function (i.e.
+    G^(2)_c(i, i+k) = <x_i x_(i+k)> - <x_i><x_(i+k)>) or the kth nearest-neighbour two-point
+    disconnected correlation function (i.e. G^(2)(i, i+k) = <x_i x_(i+k)>), depending on whether we
+    have many_MC_G_corr = True or many_MC_G_corr = False. Since <x_i> = <x_(i+k)> = m (the average
+    per-site magnetisation), the connected function just substitutes m^2 for <x_i><x_(i+k)>. '''
+
+
+# This function performs several Monte Carlo updates of a set of replicas of the same lattice, one replica for each set of values of the external field, coupling constants, and temperature.
+def many_MC_replicas(array, MC_iter, ext_fields, cc_xs, cc_ys, tepls, therm_steps_per_sample, many_MC_G_dist, many_MC_G_corr, swap_every = 0):
+    ext_fields = numpy.asarray(ext_fields, dtype = numpy.float64)
+    cc_xs = numpy.asarray(cc_xs, dtype = numpy.float64)
+    cc_ys = numpy.asarray(cc_ys, dtype = numpy.float64)
+    tepls = numpy.asarray(tepls, dtype = numpy.float64)
+    reps = len(tepls)
+
+    y_dist, x_dist = numpy.shape(array)
+    points = float(x_dist * y_dist)
+    inv_points = 1.0 / points
+
+    bs = 1.0 / tepls
+    probs_all = numpy.empty(shape = [reps, 2, 3, 3])
+
+    for rep in xrange(reps):
+        probs_all[rep] = accept_probs(ext_fields[rep], cc_xs[rep], cc_ys[rep], tepls[rep])
+
+    if many_MC_G_corr != True and many_MC_G_corr != False:
+        raise TypeError("'many_MC_G_corr' must be of type bool")
+
+    conn_weight = 1.0 if many_MC_G_corr == True else 0.0
+
+    now_lats = numpy.ascontiguousarray(numpy.tile(array, (reps, 1, 1)), dtype = numpy.int8)
+    nbr_x, nbr_y = neighbour_tables(x_dist, y_dist, many_MC_G_dist)
+
+    stream_states = numpy.random.randint(1, 2**62, size = reps, dtype = numpy.int64).astype(numpy.uint64)
+
+    sum_M, sum_M2, sum_E, sum_E2, sum_G = run_replicas(now_lats, probs_all, nbr_x, nbr_y, MC_iter, therm_steps_per_sample, ext_fields, cc_xs, cc_ys, bs, True, conn_weight, swap_every, stream_states)
+
+    inv_iter = 1.0 / MC_iter
+
+    avg_M = sum_M * inv_iter
+    avg_m = avg_M * inv_points
+    avg_E = sum_E * inv_iter
+    avg_e = avg_E * inv_points
+    avg_G = sum_G * inv_iter
+
+    var_M = sum_M2 * inv_iter - avg_M ** 2.0
+    var_E = sum_E2 * inv_iter - avg_E ** 2.0
+
+    cv = bs * bs * var_E * inv_points
+    sus = numpy.where(ext_fields != 0.0, bs * var_M * inv_points, bs * var_M * inv_points * inv_points)
+
+    return (now_lats, avg_M, avg_m, avg_E, avg_e, avg_G, sus, cv)
+
+''' This returns the same quantities as many_MC(), as arrays with one entry per replica; each replica
+    starts from its own copy of array, and draws its random numbers from its own stream, seeded from
+    NumPy's generator. The susceptibility follows many_MC(), including its extra
+    factor of 1/points for replicas with no external field. '''
+
+
+# This function seeds the random number generator used inside the compiled kernels.
+@numba.njit("void(int64)", cache = True)
+def seed_kernels(seed):
+    numpy.random.seed(seed)
+
+''' Numba keeps its own random number generator state, separate from NumPy's, so calling
+    numpy.random.seed() from ordinary Python code would have no effect on MC_update(). '''
+
+
+# This function evaluates func at every parameter tuple in param_list, spreading them over n_cores threads.
+def parallel_map(func, param_list):
+    pool = multiprocessing.pool.ThreadPool(processes = n_cores)
+
+    try:
+        results = pool.map(func, param_list)
+    finally:
+        pool.close()
+        pool.join()
+
+    return results
+
+''' The points of a parameter sweep are independent Markov chains, so they can run side by side.
+    Each parameter tuple carries its own seed, drawn beforehand from NumPy's generator, so that the
+    chains don't share a random number stream and a seeded run is reproducible; Numba keeps a
+    separate generator state for each thread, and seed_kernels() seeds the one of the thread it
+    runs in.
+
+    We use threads rather than processes: the compiled kernels release the GIL (nogil = True), and
+    nearly all of the time of a sweep point is spent inside run_sample(), so the points run
+    concurrently without having to start worker processes or pickle the lattices, tables, and
+    results between them. Since the threads share memory, the sweep points hand many_MC() a copy of
+    the initial lattice, rather than the lattice itself, which many_MC() would otherwise update in
+    place. '''
 
 
 # This function defines the hyperbolic secant squared function, used in the ideal values, via numpy.
@@ -237,42 +519,55 @@ def ideal_vals_0NN(ideal_T_0NN, ideal_h_0NN):
     return (ideal_0NN_m, ideal_0NN_u, ideal_0NN_sus, ideal_0NN_cv)
 
 
+# This function runs the simulation at a single point of the 0NN sweep and compares it with the ideal values.
+def sweep_0NN_point(point_params_0NN):
+    lat_i_0NN, MC_iter_0NN, h_now_0NN, T_now_0NN, therm_steps_0NN, G_dist_0NN, G_conn_0NN, probs_0NN, seed_0NN = point_params_0NN
+
+    seed_kernels(seed_0NN)
+    MC_results_now_0NN = many_MC(lat_i_0NN.copy(), MC_iter_0NN, h_now_0NN, 0.0, 0.0, T_now_0NN, therm_steps_0NN, G_dist_0NN, G_conn_0NN, probs_0NN, False)
+    ideal_vals_now_0NN = ideal_vals_0NN(T_now_0NN, h_now_0NN)
+
+    ideal_m_now_0NN = ideal_vals_now_0NN[0]
+    m_diff_now_0NN = ideal_m_now_0NN - MC_results_now_0NN[2]
+
+    ideal_u_now_0NN = ideal_vals_now_0NN[1]
+    u_diff_now_0NN = ideal_u_now_0NN - MC_results_now_0NN[4]
+
+    ideal_chi_now_0NN = ideal_vals_now_0NN[2]
+    chi_diff_now_0NN = ideal_chi_now_0NN - MC_results_now_0NN[6]
+
+    ideal_cv_now_0NN = ideal_vals_now_0NN[3]
+    cv_diff_now_0NN = ideal_cv_now_0NN - MC_results_now_0NN[7]
+
+    return ([T_now_0NN, h_now_0NN, ideal_m_now_0NN, m_diff_now_0NN], [T_now_0NN, h_now_0NN, ideal_u_now_0NN, u_diff_now_0NN], [T_now_0NN, h_now_0NN, ideal_chi_now_0NN, chi_diff_now_0NN], [T_now_0NN, h_now_0NN, ideal_cv_now_0NN, cv_diff_now_0NN])
+
+
 # This function sweeps across values of the external field and temperature for the 0NN case.
 def sweep_0NN(lat_i_0NN, h_min_0NN, h_max_0NN, T_min_0NN, T_max_0NN, MC_iter_0NN, points_0NN, therm_steps_0NN, G_dist_0NN, G_conn_0NN):
-    sweep_0NN_m_vals = []
-    sweep_0NN_u_vals = []
-    sweep_0NN_chi_vals = []
-    sweep_0NN_cv_vals = []
+    sweep_0NN_params = [None] * (points_0NN + 1)
 
     h_now_0NN = h_min_0NN
     T_now_0NN = T_min_0NN
     
     h_step_0NN = float((h_max_0NN - h_min_0NN) / points_0NN)
     T_step_0NN = float((T_max_0NN - T_min_0NN) / points_0NN)
+
+    seeds_0NN = numpy.random.randint(0, 2**31 - 1, size = points_0NN + 1)
     
     for point_0NN in xrange(points_0NN + 1):
-        MC_results_now_0NN = many_MC(lat_i_0NN, MC_iter_0NN, h_now_0NN, 0.0, 0.0, T_now_0NN, therm_steps_0NN, G_dist_0NN, G_conn_0NN)
-        ideal_vals_now_0NN = ideal_vals_0NN(T_now_0NN, h_now_0NN)
-
-        ideal_m_now_0NN = ideal_vals_now_0NN[0]
-        m_diff_now_0NN = ideal_m_now_0NN - MC_results_now_0NN[2]
-        sweep_0NN_m_vals += [[T_now_0NN, h_now_0NN, ideal_m_now_0NN, m_diff_now_0NN]]
-
-        ideal_u_now_0NN = ideal_vals_now_0NN[1]
-        u_diff_now_0NN = ideal_u_now_0NN - MC_results_now_0NN[4]
-        sweep_0NN_u_vals += [[T_now_0NN, h_now_0NN, ideal_u_now_0NN, u_diff_now_0NN]]
-
-        ideal_chi_now_0NN = ideal_vals_now_0NN[2]
-        chi_diff_now_0NN = ideal_chi_now_0NN - MC_results_now_0NN[6]
-        sweep_0NN_chi_vals += [[T_now_0NN, h_now_0NN, ideal_chi_now_0NN, chi_diff_now_0NN]]
-
-        ideal_cv_now_0NN = ideal_vals_now_0NN[3]
-        cv_diff_now_0NN = ideal_cv_now_0NN - MC_results_now_0NN[7]
-        sweep_0NN_cv_vals += [[T_now_0NN, h_now_0NN, ideal_cv_now_0NN, cv_diff_now_0NN]]
+        probs_now_0NN = accept_probs(h_now_0NN, 0.0, 0.0, T_now_0NN)
+        sweep_0NN_params[point_0NN] = (lat_i_0NN, MC_iter_0NN, h_now_0NN, T_now_0NN, therm_steps_0NN, G_dist_0NN, G_conn_0NN, probs_now_0NN, int(seeds_0NN[point_0NN]))
 
         h_now_0NN += h_step_0NN
         T_now_0NN += T_step_0NN
 
+    sweep_0NN_results = parallel_map(sweep_0NN_point, sweep_0NN_params)
+
+    sweep_0NN_m_vals = [point_results[0] for point_results in sweep_0NN_results]
+    sweep_0NN_u_vals = [point_results[1] for point_results in sweep_0NN_results]
+    sweep_0NN_chi_vals = [point_results[2] for point_results in sweep_0NN_results]
+    sweep_0NN_cv_vals = [point_results[3] for point_results in sweep_0NN_results]
+
     return (sweep_0NN_m_vals, sweep_0NN_u_vals, sweep_0NN_chi_vals, sweep_0NN_cv_vals)
 
 ''' This does provide information for the 0NN case if we chose to do 0NN stuff, but that really
@@ -280,38 +575,40 @@ def sweep_0NN(lat_i_0NN, h_min_0NN, h_max_0NN, T_min_0NN, T_max_0NN, MC_iter_0NN
 
 
 # This function sweeps across values of the external field and temperature for the 1NN 2D case.
-def sweep_1NN(lat_i_1NN, h_min_1NN, h_max_1NN, Jx_min_1NN, Jx_max_1NN, Jy_min_1NN, Jy_max_1NN, T_min_1NN, T_max_1NN, MC_iter_1NN, points_1NN, therm_steps_1NN, G_dist_1NN, G_conn_1NN):
-    sweep_vals = []
-
-    h_now_1NN = h_min_1NN
-    Jx_now_1NN = Jx_min_1NN
-    Jy_now_1NN = Jy_min_1NN
-    T_now_1NN = T_min_1NN
-
+def sweep_1NN(lat_i_1NN, h_min_1NN, h_max_1NN, Jx_min_1NN, Jx_max_1NN, Jy_min_1NN, Jy_max_1NN, T_min_1NN, T_max_1NN, MC_iter_1NN, points_1NN, therm_steps_1NN, G_dist_1NN, G_conn_1NN, swap_every_1NN = 0):
     h_step_1NN = float((h_max_1NN - h_min_1NN) / points_1NN)
     Jx_step_1NN = float((Jx_max_1NN - Jx_min_1NN) / points_1NN)
     Jy_step_1NN = float((Jy_max_1NN - Jy_min_1NN) / points_1NN)
     T_step_1NN = float((T_max_1NN - T_min_1NN) / points_1NN)
-    
-    point_1NN = 0
-    
-    while point_1NN <= points_1NN:
-        MC_results_now_1NN = many_MC(lat_i_1NN, MC_iter_1NN, h_now_1NN, Jx_now_1NN, Jy_now_1NN, T_now_1NN, therm_steps_1NN, G_dist_1NN, G_conn_1NN)
-        results_now = [T_now_1NN, h_now_1NN, Jx_now_1NN, Jy_now_1NN, MC_results_now_1NN[2], MC_results_now_1NN[4], MC_results_now_1NN[5], MC_results_now_1NN[6], MC_results_now_1NN[7]]
-        sweep_vals += [results_now]
-        
-        h_now_1NN += h_step_1NN
-        Jx_now_1NN += Jx_step_1NN
-        Jy_now_1NN += Jy_step_1NN
-        T_now_1NN += T_step_1NN
-        point_1NN += 1
+
+    point_nums_1NN = numpy.arange(points_1NN + 1)
+
+    h_vals_1NN = h_min_1NN + h_step_1NN * point_nums_1NN
+    Jx_vals_1NN = Jx_min_1NN + Jx_step_1NN * point_nums_1NN
+    Jy_vals_1NN = Jy_min_1NN + Jy_step_1NN * point_nums_1NN
+    T_vals_1NN = T_min_1NN + T_step_1NN * point_nums_1NN
+
+    seed_kernels(numpy.random.randint(0, 2**31 - 1))
+    MC_results_1NN = many_MC_replicas(lat_i_1NN, MC_iter_1NN, h_vals_1NN, Jx_vals_1NN, Jy_vals_1NN, T_vals_1NN, therm_steps_1NN, G_dist_1NN, G_conn_1NN, swap_every_1NN)
+
+    sweep_vals = [None] * (points_1NN + 1)
+
+    for point_1NN in xrange(points_1NN + 1):
+        sweep_vals[point_1NN] = [T_vals_1NN[point_1NN], h_vals_1NN[point_1NN], Jx_vals_1NN[point_1NN], Jy_vals_1NN[point_1NN], MC_results_1NN[2][point_1NN], MC_results_1NN[4][point_1NN], MC_results_1NN[5][point_1NN], MC_results_1NN[6][point_1NN], MC_results_1NN[7][point_1NN]]
     
     return sweep_vals
 
+''' Every point of the sweep is a replica of lat_i_1NN in many_MC_replicas(), and all of the replicas
+    are updated together. Without swaps (swap_every_1NN = 0), each point is still an independent
+    chain that relies on its own therm_steps_1NN sweeps per sample to thermalise, as before; with
+    swap_every_1NN > 0, neighbouring points also exchange configurations by parallel tempering,
+    which helps the low temperature points out of the metastable states they would otherwise get
+    stuck in. '''
+
 
 # This function provides the outputs (the relevant graphs and tables) for the 1NN 2D case.
-def output_1NN(grid_i_1NN, h_i_1NN, h_f_1NN, Jx_i_1NN, Jx_f_1NN, Jy_i_1NN, Jy_f_1NN, T_i_1NN, T_f_1NN, MC_num_1NN, pts_1NN, thrm_stps_1NN, G_len_1NN, disc_or_conn_1NN):
-    vals_1NN = numpy.array(sweep_1NN(grid_i_1NN, h_i_1NN, h_f_1NN, Jx_i_1NN, Jx_f_1NN, Jy_i_1NN, Jy_f_1NN, T_i_1NN, T_f_1NN, MC_num_1NN, pts_1NN, thrm_stps_1NN, G_len_1NN, disc_or_conn_1NN))
+def output_1NN(grid_i_1NN, h_i_1NN, h_f_1NN, Jx_i_1NN, Jx_f_1NN, Jy_i_1NN, Jy_f_1NN, T_i_1NN, T_f_1NN, MC_num_1NN, pts_1NN, thrm_stps_1NN, G_len_1NN, disc_or_conn_1NN, swp_evry_1NN = 0):
+    vals_1NN = numpy.array(sweep_1NN(grid_i_1NN, h_i_1NN, h_f_1NN, Jx_i_1NN, Jx_f_1NN, Jy_i_1NN, Jy_f_1NN, T_i_1NN, T_f_1NN, MC_num_1NN, pts_1NN, thrm_stps_1NN, G_len_1NN, disc_or_conn_1NN, swp_evry_1NN))
 
     T_vals_1NN = vals_1NN[:,0]
     m_vals_1NN = vals_1NN[:,4]
@@ -353,25 +650,29 @@ def output_1NN(grid_i_1NN, h_i_1NN, h_f_1NN, Jx_i_1NN, Jx_f_1NN, Jy_i_1NN, Jy_f_
 
 
 # Here, we run the simulation. For testing, we also print the actual arrays; these commands are then commented out as necessary.
-print "Initial 2D Ising Grid:"
-print "                      "
-print_grid(initial_grid)
-print "                      "
-print "                      "
-updated_grid = many_MC(initial_grid, MC_num, h_start, Jx_start, Jy_start, T_start, 10, 1, False)
-print "Updated 2D Ising Grid:"
-print "                      "
-print_grid(updated_grid[0])
-output_1NN(initial_grid, h_start, h_end, Jx_start, Jx_end, Jy_start, Jy_start, T_start, T_end, MC_num, sweeps, MC_therm_steps, kNN_2pt_G_dist, kNN_2pt_G_conn)
-
-
-# This section stores the time at the end of the program.
-program_end_time = time.clock()
-total_program_time = program_end_time - program_start_time
-print "                      "
-print "Program run time: %f seconds" % (total_program_time)
-print "Program run time per site per MC sweep: %6g seconds" % (total_program_time / (MC_num * MC_therm_steps * sweeps * size))
+if __name__ == "__main__":
+    print "Initial 2D Ising Grid:"
+    print "                      "
+    print_grid(initial_grid)
+    print "                      "
+    print "                      "
+    updated_grid = many_MC(initial_grid, MC_num, h_start, Jx_start, Jy_start, T_start, 10, 1, False)
+    print "Updated 2D Ising Grid:"
+    print "                      "
+    print_grid(updated_grid[0])
+    output_1NN(initial_grid, h_start, h_end, Jx_start, Jx_end, Jy_start, Jy_start, T_start, T_end, MC_num, sweeps, MC_therm_steps, kNN_2pt_G_dist, kNN_2pt_G_conn, PT_swap_every)
+
+
+    # This section stores the time at the end of the program.
+    program_end_time = time.clock()
+    total_program_time = program_end_time - program_start_time
+    print "                      "
+    print "Program run time: %f seconds" % (total_program_time)
+    print "Program run time per site per MC sweep: %6g seconds" % (total_program_time / (MC_num * MC_therm_steps * sweeps * size))
 
 ''' Note: To find out how long the program takes, we take the difference of time.clock() evaluated
     at the beginning of the program and at the end of the program. Here, we take the time at the end
-    of the program, and define the total program time. '''
+    of the program, and define the total program time.
+
+    The run itself sits under if __name__ == "__main__", so that the script can be imported, to use
+    its functions, without running the whole simulation. '''